@@ -6,12 +6,16 @@ reasoning using the ReAct (Reasoning-Action-Observation) pattern. The agent
 can interact with file system tools while maintaining security constraints.
 """
 
+import functools
 import json
 import logging
 import os
+import random
 import re
 import sys
-import uuid
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
@@ -54,6 +58,75 @@ from workspace_fs import Workspace
 from .react_loop import ReActLoop
 
 
+# Logger bound to the conversation currently being processed, so tool wrappers
+# log with conversation context without rebinding on every call.
+_conversation_logger: ContextVar[Optional[Any]] = ContextVar("conversation_logger", default=None)
+
+# Bytes read from the start of large files to build the get_file_info preview
+_PREVIEW_HEAD_BYTES = 4096
+
+# Seeded once from the OS; per-query ids then need no further entropy syscalls
+_conversation_id_random = random.Random()
+
+
+def _new_conversation_id() -> str:
+    """
+    Generate a ULID-style conversation ID.
+    
+    The 48-bit millisecond timestamp prefix keeps IDs sortable by creation
+    time, which helps correlate log entries; the 80 random bits make
+    collisions practically impossible.
+    """
+    millis = time.time_ns() // 1_000_000
+    return f"{(millis << 80) | _conversation_id_random.getrandbits(80):032x}"
+
+
+# Static part of the agent system prompt; tool-specific sections are appended
+# once per agent by SecureAgent._system_prompt.
+_BASE_SYSTEM_PROMPT = """You are a secure AI assistant specialized in file system operations.
+
+You have access to the following tools:
+
+CORE FILE OPERATIONS:
+- list_files(): List all files in the workspace (sorted by modification time, newest first)
+- list_directories(): List all directories in the workspace (sorted by modification time, newest first)
+- list_all(): List both files and directories (directories marked with '/')
+- tree(): Display workspace structure in beautiful tree format - perfect for understanding project hierarchy
+- show_complete_workspace(): Show COMPLETE workspace contents with NO truncation - guarantees ALL items are displayed
+- read_file(filename): Read content from a file
+- write_file(filename, content, mode): Write content to a file
+- delete_file(filename): Delete a file
+- answer_question_about_files(query): Answer questions about file contents using AI analysis
+
+ADVANCED OPERATIONS:
+- read_newest_file(): Read the most recently modified file
+- find_files_by_pattern(pattern): Find files matching a pattern (substring search)
+- get_file_info(filename): Get detailed metadata about a file
+
+VISUALIZATION TOOLS:
+- tree(): Perfect for seeing directory structure - shows beautiful tree format with recursive navigation
+- Use this when user wants to see "structure", "tree", "hierarchy", or "organization" of files/folders
+
+IMPORTANT: When user asks for complete listing, tree structure, or wants to see the project organization:
+- Use tree() for beautiful hierarchical visualization of the complete project structure
+- Use show_complete_workspace() to guarantee complete display without truncation
+- These tools NEVER truncate and show every single item
+
+IMPORTANT CONSTRAINTS:
+1. You can ONLY operate on files within your assigned workspace
+2. You cannot access files outside the workspace or use path traversal
+3. All filenames must be simple names without path separators
+4. Be helpful but always respect security boundaries
+
+When solving problems:
+1. THINK through what you need to do step by step
+2. ACT by calling the appropriate tools
+3. OBSERVE the results and continue reasoning
+4. Provide clear, helpful responses to the user
+
+Always explain your reasoning and what tools you're using."""
+
+
 class ToolResultFormatter:
     """Enhanced formatting for tool results to improve readability and error handling."""
     
@@ -239,15 +312,39 @@ class SandboxValidator:
         return result
 
 
-class ConversationContext(BaseModel):
-    """Context information for a conversation session."""
+@dataclass(slots=True)
+class ConversationContext:
+    """
+    Context information for a conversation session.
+    
+    A plain dataclass rather than a Pydantic model: it is built once per query
+    from trusted values and only read (or updated in place) by the ReAct loop,
+    so field validation would be pure overhead.
+    """
     
     conversation_id: str
     user_query: str
-    original_user_query: Optional[str] = None  # Added for translation support
     workspace_path: str
     timestamp: datetime
+    original_user_query: Optional[str] = None  # Added for translation support
     debug_mode: bool = False
+    
+    @classmethod
+    def from_query(
+        cls,
+        conversation_id: str,
+        user_query: str,
+        workspace_path: str,
+        debug_mode: bool = False
+    ) -> "ConversationContext":
+        """Create the context for a query received now."""
+        return cls(
+            conversation_id=conversation_id,
+            user_query=user_query,
+            workspace_path=workspace_path,
+            timestamp=datetime.now(),
+            debug_mode=debug_mode
+        )
 
 
 class AgentResponse(BaseModel):
@@ -393,48 +490,29 @@ class SecureAgent:
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the agent."""
-        return """You are a secure AI assistant specialized in file system operations.
-
-You have access to the following tools:
-
-CORE FILE OPERATIONS:
-- list_files(): List all files in the workspace (sorted by modification time, newest first)
-- list_directories(): List all directories in the workspace (sorted by modification time, newest first)
-- list_all(): List both files and directories (directories marked with '/')
-- tree(): Display workspace structure in beautiful tree format - perfect for understanding project hierarchy
-- show_complete_workspace(): Show COMPLETE workspace contents with NO truncation - guarantees ALL items are displayed
-- read_file(filename): Read content from a file
-- write_file(filename, content, mode): Write content to a file
-- delete_file(filename): Delete a file
-- answer_question_about_files(query): Answer questions about file contents using AI analysis
-
-ADVANCED OPERATIONS:
-- read_newest_file(): Read the most recently modified file
-- find_files_by_pattern(pattern): Find files matching a pattern (substring search)
-- get_file_info(filename): Get detailed metadata about a file
-
-VISUALIZATION TOOLS:
-- tree(): Perfect for seeing directory structure - shows beautiful tree format with recursive navigation
-- Use this when user wants to see "structure", "tree", "hierarchy", or "organization" of files/folders
-
-IMPORTANT: When user asks for complete listing, tree structure, or wants to see the project organization:
-- Use tree() for beautiful hierarchical visualization of the complete project structure
-- Use show_complete_workspace() to guarantee complete display without truncation
-- These tools NEVER truncate and show every single item
-
-IMPORTANT CONSTRAINTS:
-1. You can ONLY operate on files within your assigned workspace
-2. You cannot access files outside the workspace or use path traversal
-3. All filenames must be simple names without path separators
-4. Be helpful but always respect security boundaries
-
-When solving problems:
-1. THINK through what you need to do step by step
-2. ACT by calling the appropriate tools
-3. OBSERVE the results and continue reasoning
-4. Provide clear, helpful responses to the user
-
-Always explain your reasoning and what tools you're using."""
+        return self._system_prompt
+    
+    @functools.cached_property
+    def _system_prompt(self) -> str:
+        """
+        System prompt composed once per agent from the static base and tool metadata.
+        
+        Must be first accessed after all tools are registered, so that tools not
+        covered by the static base prompt are described from their metadata.
+        """
+        sections = [_BASE_SYSTEM_PROMPT]
+        extra_tools = [
+            f"- {name}({', '.join(meta.get('parameters', {}))}): {meta.get('description', name)}"
+            for name, meta in (
+                (name, getattr(func, "tool_metadata", None))
+                for name, func in self.file_tools.items()
+            )
+            if isinstance(meta, dict) and f"{name}(" not in _BASE_SYSTEM_PROMPT
+        ]
+        if extra_tools:
+            sections.append("\n\nADDITIONAL TOOLS:\n")
+            sections.append("\n".join(extra_tools))
+        return "".join(sections)
     
     async def process_query(self, user_query: str) -> AgentResponse:
         """
@@ -465,7 +543,7 @@ Always explain your reasoning and what tools you're using."""
         """
         # Generate conversation ID if not provided
         if conversation_id is None:
-            conversation_id = str(uuid.uuid4())
+            conversation_id = _new_conversation_id()
         
         # Check for ambiguous responses if memory tools are available
         if "check_ambiguous_response" in self.file_tools:
@@ -495,15 +573,14 @@ Please interpret the user's response in the context of the previous conversation
                     error=str(e)
                 )
         
-        conversation_id = str(uuid.uuid4())
-        context = ConversationContext(
-            conversation_id=conversation_id,
-            user_query=user_query,
-            workspace_path=self.workspace_path,
-            timestamp=datetime.now(),
-            debug_mode=self.debug_mode
+        conversation_id = _new_conversation_id()
+        context = ConversationContext.from_query(
+            conversation_id, user_query, self.workspace_path, self.debug_mode
         )
         
+        # Bind conversation context once; tool wrappers pick it up via the ContextVar
+        log = self.logger.bind(conversation_id=conversation_id)
+        
         # Start diagnostics tracking for this operation
         operation_id = start_operation("process_query", {
             "conversation_id": conversation_id,
@@ -514,12 +591,12 @@ Please interpret the user's response in the context of the previous conversation
         # Log conversation start for usage statistics
         log_conversation_start(conversation_id, user_query)
         
-        self.logger.info(
+        log.info(
             "Processing user query",
-            conversation_id=conversation_id,
             query=user_query
         )
         
+        log_token = _conversation_logger.set(log)
         try:
             # Use ReAct loop for reasoning
             result = await self.react_loop.execute(user_query, context)
@@ -548,14 +625,10 @@ Please interpret the user's response in the context of the previous conversation
                             "debug_mode": self.debug_mode
                         }
                     )
-                    self.logger.debug(
-                        "Interaction stored in memory",
-                        conversation_id=conversation_id
-                    )
+                    log.debug("Interaction stored in memory")
                 except Exception as e:
-                    self.logger.warning(
+                    log.warning(
                         "Failed to store interaction in memory",
-                        conversation_id=conversation_id,
                         error=str(e)
                     )
             
@@ -566,9 +639,8 @@ Please interpret the user's response in the context of the previous conversation
                 result_summary=f"Query processed successfully, {len(result.tools_used)} tools used"
             )
             
-            self.logger.info(
+            log.info(
                 "Query processed successfully",
-                conversation_id=conversation_id,
                 tools_used=result.tools_used
             )
             
@@ -576,9 +648,8 @@ Please interpret the user's response in the context of the previous conversation
             
         except AgentError as e:
             # Agent-specific errors with enhanced formatting
-            self.logger.error(
+            log.error(
                 "Agent error processing query",
-                conversation_id=conversation_id,
                 error_code=e.error_code,
                 error_type=type(e).__name__,
                 context=e.context
@@ -604,9 +675,8 @@ Please interpret the user's response in the context of the previous conversation
                         }
                     )
                 except Exception as store_error:
-                    self.logger.warning(
+                    log.warning(
                         "Failed to store error interaction in memory",
-                        conversation_id=conversation_id,
                         error=str(store_error)
                     )
             
@@ -627,9 +697,8 @@ Please interpret the user's response in the context of the previous conversation
             
         except Exception as e:
             # Unexpected errors - wrap in generic AgentError
-            self.logger.error(
+            log.error(
                 "Unexpected error processing query",
-                conversation_id=conversation_id,
                 error=str(e),
                 error_type=type(e).__name__
             )
@@ -669,9 +738,8 @@ Please interpret the user's response in the context of the previous conversation
                         }
                     )
                 except Exception as store_error:
-                    self.logger.warning(
+                    log.warning(
                         "Failed to store unexpected error in memory",
-                        conversation_id=conversation_id,
                         error=str(store_error)
                     )
             
@@ -682,11 +750,12 @@ Please interpret the user's response in the context of the previous conversation
                 success=False,
                 error_message=str(e)
             )
+        
+        finally:
+            _conversation_logger.reset(log_token)
     
     def _add_advanced_file_operations(self) -> None:
         """Add advanced file operations for Task 4.3 with enhanced capabilities."""
-        import time
-        
         def read_newest_file() -> str:
             """Read the content of the most recently modified file."""
             start_time = time.time()
@@ -699,31 +768,14 @@ Please interpret the user's response in the context of the previous conversation
                     return "No files found in workspace"
                 
                 # list_files returns a list of files sorted by modification time (newest first)
-                if isinstance(files, list) and files:
-                    newest_file = files[0]
-                    content = raw_tools["read_file"](newest_file)
-                    execution_time = time.time() - start_time
-                    return ToolResultFormatter.format_success_result(
-                        "read_newest_file", 
-                        f"Content of newest file '{newest_file}':\n{content}",
-                        execution_time
-                    )
-                elif isinstance(files, str) and files.strip():
-                    # Handle string format (fallback)
-                    file_list = files.strip().split('\n')
-                    if file_list and file_list[0]:
-                        newest_file = file_list[0]
-                        content = raw_tools["read_file"](newest_file)
-                        execution_time = time.time() - start_time
-                        return ToolResultFormatter.format_success_result(
-                            "read_newest_file",
-                            f"Content of newest file '{newest_file}':\n{content}",
-                            execution_time
-                        )
-                    else:
-                        return "No files found in workspace"
-                else:
-                    return "No files found in workspace"
+                newest_file = files[0]
+                content = raw_tools["read_file"](newest_file)
+                execution_time = time.time() - start_time
+                return ToolResultFormatter.format_success_result(
+                    "read_newest_file", 
+                    f"Content of newest file '{newest_file}':\n{content}",
+                    execution_time
+                )
             except Exception as e:
                 execution_time = time.time() - start_time
                 return ToolResultFormatter.format_error_result("read_newest_file", e, execution_time)
@@ -751,8 +803,7 @@ Please interpret the user's response in the context of the previous conversation
                 if not files:
                     return "No files found in workspace"
                 
-                file_list = files if isinstance(files, list) else files.strip().split('\n')
-                matching_files = [f for f in file_list if f and fnmatch.fnmatch(f, pattern)]
+                matching_files = [f for f in files if fnmatch.fnmatch(f, pattern)]
                 
                 execution_time = time.time() - start_time
                 
@@ -821,7 +872,10 @@ Please interpret the user's response in the context of the previous conversation
                         lines = len(content.split('\n'))
                         words = len(content.split())
                     else:
-                        preview = "[File too large for preview]"
+                        # Large files: decode only a bounded head for the preview
+                        with file_path.open('rb') as f:
+                            head = f.read(_PREVIEW_HEAD_BYTES).decode('utf-8', errors='ignore')
+                        preview = '\n'.join(head.split('\n')[:5]) + "\n..."
                         lines = "Unknown"
                         words = "Unknown"
                 except:
@@ -916,12 +970,11 @@ Please interpret the user's response in the context of the previous conversation
                 if not files:
                     return "No files found in workspace"
                 
-                file_list = files if isinstance(files, list) else files.strip().split('\n')
                 ext = extension.lower() if not extension.startswith('.') else extension.lower()
                 if not ext.startswith('.'):
                     ext = '.' + ext
                 
-                matching_files = [f for f in file_list if f and f.lower().endswith(ext)]
+                matching_files = [f for f in files if f.lower().endswith(ext)]
                 
                 execution_time = time.time() - start_time
                 
@@ -1084,7 +1137,10 @@ Please interpret the user's response in the context of the previous conversation
     
     def _create_enhanced_file_tools(self, **fs_kwargs: Any) -> Dict[str, Any]:
         """Create file system tools with enhanced error handling and formatting."""
-        import time
+        # Bind hot-path callables once so each wrapper call skips the attribute lookups
+        fmt_ok = ToolResultFormatter.format_success_result
+        fmt_err = ToolResultFormatter.format_error_result
+        perf_counter = time.perf_counter
         
         # Get basic tools
         basic_tools = create_file_tools(self.workspace, **fs_kwargs)
@@ -1094,19 +1150,19 @@ Please interpret the user's response in the context of the previous conversation
         for tool_name, tool_func in basic_tools.items():
             def create_enhanced_wrapper(name: str, func: callable):
                 def enhanced_wrapper(*args, **kwargs):
-                    start_time = time.time()
+                    start_time = perf_counter()
                     try:
                         # Execute the original tool function
                         result = func(*args, **kwargs)
-                        execution_time = time.time() - start_time
+                        execution_time = perf_counter() - start_time
                         
                         # Format successful result
-                        formatted_result = ToolResultFormatter.format_success_result(
+                        formatted_result = fmt_ok(
                             name, result, execution_time
                         )
                         
                         if self.debug_mode:
-                            self.logger.debug(
+                            (_conversation_logger.get() or self.logger).debug(
                                 "Tool executed successfully",
                                 tool=name,
                                 args=args,
@@ -1117,14 +1173,14 @@ Please interpret the user's response in the context of the previous conversation
                         return formatted_result
                         
                     except Exception as e:
-                        execution_time = time.time() - start_time
+                        execution_time = perf_counter() - start_time
                         
                         # Format error result
-                        formatted_error = ToolResultFormatter.format_error_result(
+                        formatted_error = fmt_err(
                             name, e, execution_time
                         )
                         
-                        self.logger.error(
+                        (_conversation_logger.get() or self.logger).error(
                             "Tool execution failed",
                             tool=name,
                             args=args,
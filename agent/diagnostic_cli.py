@@ -4,14 +4,14 @@ Diagnostic CLI tool for the AI File System Agent.
 Provides easy access to performance metrics, usage statistics, and health checks.
 """
 
-import asyncio
 import click
-import json
+import contextlib
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from datetime import datetime
 
 from agent.diagnostics import (
@@ -19,41 +19,154 @@ from agent.diagnostics import (
     get_performance_summary,
     get_usage_statistics,
     export_diagnostics,
-    health_check
+    health_check,
+    get_performance_summary_json,
+    get_usage_statistics_json,
+    health_check_json,
+    tail_lines
 )
 
 
-console = Console()
+try:
+    from watchfiles import watch
+except ImportError:  # Optional; `logs --follow` falls back to polling
+    watch = None
+
+
+@functools.lru_cache(maxsize=None)
+def _get_console():
+    """
+    Create the shared Rich console on first use.
+    
+    Rich is imported lazily so that JSON output and --help do not pay its
+    import cost.
+    """
+    from rich.console import Console
+    return Console()
+
+# Rich color used to render each health status
+_STATUS_COLOR = {
+    "HEALTHY": "green",
+    "DEGRADED": "yellow",
+    "UNHEALTHY": "red",
+    "UNKNOWN": "cyan"
+}
+
+
+def _is_interactive() -> bool:
+    """Whether spinners are worth drawing: stdout is a terminal and not running under CI."""
+    return sys.stdout.isatty() and not os.environ.get("CI")
+
+
+class _NullProgress:
+    """Stand-in for rich Progress when spinners are disabled."""
+    
+    def update(self, *args, **kwargs) -> None:
+        pass
+
+
+@contextlib.contextmanager
+def _spinner(description: str):
+    """Show a transient spinner while a command gathers data; yields (task, progress)."""
+    ctx = click.get_current_context(silent=True)
+    options = ctx.find_root().obj if ctx is not None else None
+    if not (options or {}).get("spinner", _is_interactive()):
+        # Headless runs skip Rich's refresh thread and ANSI output entirely
+        yield None, _NullProgress()
+        return
+    
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=_get_console()
+    ) as progress:
+        yield progress.add_task(description, total=None), progress
+
+
+def _emit_json(blob: bytes) -> None:
+    """Write already-serialized JSON straight to stdout, bypassing Rich."""
+    sys.stdout.buffer.write(blob + b"\n")
+    sys.stdout.flush()
+
+
+def _follow_file(log_file: Path) -> None:
+    """
+    Print lines appended to a log file until interrupted, like ``tail -f``.
+    
+    Uses filesystem notifications from watchfiles when installed, so the loop
+    only wakes up when the file changes; otherwise polls every 100 ms. A
+    rotated (replaced) or truncated file is reopened from its beginning.
+    """
+    console = _get_console()
+    f = open(log_file, 'r')
+    try:
+        f.seek(0, 2)
+        
+        def drain() -> None:
+            nonlocal f
+            try:
+                current = os.stat(log_file)
+            except FileNotFoundError:
+                return
+            if current.st_ino != os.fstat(f.fileno()).st_ino or current.st_size < f.tell():
+                f.close()
+                f = open(log_file, 'r')
+            for line in iter(f.readline, ''):
+                console.print(line.rstrip())
+        
+        if watch is None:
+            while True:
+                drain()
+                time.sleep(0.1)
+        
+        # Watch the directory so that rotation (a new inode) is still noticed
+        watched_name = log_file.name
+        for _changes in watch(
+            log_file.parent,
+            watch_filter=lambda _change, path: Path(path).name == watched_name,
+            debounce=50,
+            recursive=False,
+        ):
+            drain()
+    finally:
+        f.close()
 
 
 @click.group()
-def cli():
+@click.option('--no-spinner', is_flag=True,
+              help='Disable progress spinners (automatic when stdout is not a TTY or $CI is set)')
+@click.pass_context
+def cli(ctx, no_spinner):
     """AI File System Agent Diagnostic Tools"""
-    pass
+    ctx.obj = {"spinner": not no_spinner and _is_interactive()}
 
 
 @cli.command()
 @click.option('--hours', default=24, help='Hours to look back for performance data')
+@click.option('--top', 'top_k', default=5, help='Number of slowest operations to show')
 @click.option('--format', 'output_format', default='table', 
               type=click.Choice(['table', 'json']), help='Output format')
-def performance(hours, output_format):
+def performance(hours, top_k, output_format):
     """Show performance metrics and statistics."""
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console
-    ) as progress:
-        task = progress.add_task("Gathering performance data...", total=None)
+    if output_format == 'json':
+        try:
+            _emit_json(get_performance_summary_json(hours, top_k))
+        except Exception as e:
+            click.echo(f"Error gathering performance data: {e}", err=True)
+        return
+    
+    from rich.table import Table
+    console = _get_console()
+    
+    with _spinner("Gathering performance data...") as (task, progress):
         
         try:
-            perf_data = get_performance_summary(hours)
+            perf_data = get_performance_summary(hours, top_k)
             progress.update(task, description="Processing performance data...")
             
-            if output_format == 'json':
-                console.print_json(json.dumps(perf_data, indent=2))
-                return
-            
             # Display as rich table
             if "message" in perf_data:
                 console.print(f"[yellow]{perf_data['message']}[/yellow]")
@@ -104,20 +217,21 @@ def performance(hours, output_format):
 def usage(output_format):
     """Show usage statistics."""
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console
-    ) as progress:
-        task = progress.add_task("Gathering usage statistics...", total=None)
+    if output_format == 'json':
+        try:
+            _emit_json(get_usage_statistics_json())
+        except Exception as e:
+            click.echo(f"Error gathering usage statistics: {e}", err=True)
+        return
+    
+    from rich.table import Table
+    console = _get_console()
+    
+    with _spinner("Gathering usage statistics...") as (task, progress):
         
         try:
             usage_data = get_usage_statistics()
             
-            if output_format == 'json':
-                console.print_json(json.dumps(usage_data, indent=2))
-                return
-            
             # Main statistics table
             stats_table = Table(title="Usage Statistics")
             stats_table.add_column("Metric", style="cyan")
@@ -163,30 +277,28 @@ def usage(output_format):
 def health(output_format):
     """Perform system health check."""
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console
-    ) as progress:
-        task = progress.add_task("Performing health check...", total=None)
+    if output_format == 'json':
+        try:
+            _emit_json(health_check_json())
+        except Exception as e:
+            click.echo(f"Error performing health check: {e}", err=True)
+        return
+    
+    from rich.panel import Panel
+    from rich.table import Table
+    from rich.text import Text
+    console = _get_console()
+    
+    with _spinner("Performing health check...") as (task, progress):
         
         try:
             health_data = health_check()
             
-            if output_format == 'json':
-                console.print_json(json.dumps(health_data, indent=2))
-                return
-            
             # Overall status
-            status_color = {
-                "HEALTHY": "green",
-                "DEGRADED": "yellow", 
-                "UNHEALTHY": "red",
-                "UNKNOWN": "cyan"
-            }.get(health_data['overall_status'], "white")
+            status_color = _STATUS_COLOR.get(health_data['overall_status'], "white")
             
             console.print(Panel(
-                f"[{status_color}]{health_data['overall_status']}[/{status_color}]",
+                Text(health_data['overall_status'], style=status_color),
                 title="Overall System Status",
                 expand=False
             ))
@@ -199,12 +311,7 @@ def health(output_format):
             
             for component, details in health_data['components'].items():
                 status = details['status']
-                status_color = {
-                    "HEALTHY": "green",
-                    "DEGRADED": "yellow",
-                    "UNHEALTHY": "red", 
-                    "UNKNOWN": "cyan"
-                }.get(status, "white")
+                status_color = _STATUS_COLOR.get(status, "white")
                 
                 # Format details
                 detail_parts = []
@@ -212,10 +319,11 @@ def health(output_format):
                     if key != 'status':
                         detail_parts.append(f"{key}: {value}")
                 
+                # Text cells are rendered as-is, skipping Rich's markup parser
                 components_table.add_row(
                     component.replace('_', ' ').title(),
-                    f"[{status_color}]{status}[/{status_color}]",
-                    " | ".join(detail_parts)
+                    Text(status, style=status_color),
+                    Text(" | ".join(detail_parts))
                 )
             
             console.print(components_table)
@@ -225,21 +333,21 @@ def health(output_format):
 
 
 @cli.command()
-@click.option('--output', help='Output file path (default: logs/diagnostics_TIMESTAMP.json)')
+@click.option('--output', help='Output file path (default: logs/diagnostics_TIMESTAMP.<format>)')
+@click.option('--format', 'output_format', default='json',
+              type=click.Choice(['json', 'ndjson']),
+              help='Export format: indented JSON document or one record per line')
 @click.option('--open', 'open_file', is_flag=True, help='Open the generated file after export')
-def export(output, open_file):
+def export(output, output_format, open_file):
     """Export comprehensive diagnostics to a file."""
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console
-    ) as progress:
-        task = progress.add_task("Exporting diagnostics...", total=None)
+    console = _get_console()
+    
+    with _spinner("Exporting diagnostics...") as (task, progress):
         
         try:
             output_path = Path(output) if output else None
-            exported_file = export_diagnostics(output_path)
+            exported_file = export_diagnostics(output_path, output_format)
             
             progress.update(task, description="Diagnostics exported successfully")
             
@@ -258,13 +366,19 @@ def export(output, open_file):
             
             if open_file:
                 import subprocess
-                import sys
-                if sys.platform == "darwin":  # macOS
-                    subprocess.run(["open", str(exported_file)])
-                elif sys.platform == "linux":
-                    subprocess.run(["xdg-open", str(exported_file)])
-                elif sys.platform == "win32":
-                    subprocess.run(["start", str(exported_file)], shell=True)
+                if sys.platform == "win32":
+                    # Shell API call; no cmd.exe process or shell parsing of the path
+                    os.startfile(str(exported_file))
+                elif sys.platform in ("darwin", "linux"):
+                    opener = "open" if sys.platform == "darwin" else "xdg-open"
+                    # Detach so the command returns without waiting on the viewer
+                    subprocess.Popen(
+                        [opener, str(exported_file)],
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        start_new_session=True
+                    )
             
         except Exception as e:
             console.print(f"[red]Error exporting diagnostics: {e}[/red]")
@@ -277,6 +391,8 @@ def export(output, open_file):
 def logs(follow, lines, log_type):
     """View log files."""
     
+    console = _get_console()
+    
     log_files = {
         'agent': 'logs/agent_activity.log',
         'performance': 'logs/performance.jsonl',
@@ -288,10 +404,17 @@ def logs(follow, lines, log_type):
         # Show summary of all logs
         console.print("[bold]Log File Summary[/bold]")
         
+        # One directory scan instead of an exists() + stat() pair per file
+        try:
+            with os.scandir('logs') as it:
+                entries = {entry.name: entry for entry in it}
+        except FileNotFoundError:
+            entries = {}
+        
         for log_name, log_path in log_files.items():
-            log_file = Path(log_path)
-            if log_file.exists():
-                stat = log_file.stat()
+            entry = entries.get(Path(log_path).name)
+            if entry is not None and entry.is_file():
+                stat = entry.stat()
                 size_mb = stat.st_size / (1024 * 1024)
                 modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
                 console.print(f"[cyan]{log_name}[/cyan]: {size_mb:.2f} MB, modified {modified}")
@@ -308,28 +431,18 @@ def logs(follow, lines, log_type):
     try:
         if follow:
             console.print(f"[cyan]Following {log_file}[/cyan] (Press Ctrl+C to stop)")
-            # Simple tail -f implementation
-            import time
-            with open(log_file, 'r') as f:
-                # Seek to end
-                f.seek(0, 2)
-                while True:
-                    line = f.readline()
-                    if not line:
-                        time.sleep(0.1)
-                        continue
-                    console.print(line.rstrip())
+            _follow_file(log_file)
         else:
             # Show last N lines
-            with open(log_file, 'r') as f:
-                all_lines = f.readlines()
-                recent_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
-                
-                console.print(f"[cyan]Last {len(recent_lines)} lines from {log_file}[/cyan]")
-                console.print("-" * 80)
-                
-                for line in recent_lines:
-                    console.print(line.rstrip())
+            recent_lines = tail_lines(log_file, lines)
+            
+            console.print(f"[cyan]Last {len(recent_lines)} lines from {log_file}[/cyan]")
+            console.print("-" * 80)
+            
+            # Log lines are plain text/JSONL, so write them in one go without Rich rendering
+            if recent_lines and not recent_lines[-1].endswith('\n'):
+                recent_lines[-1] += '\n'
+            sys.stdout.writelines(recent_lines)
                     
     except KeyboardInterrupt:
         console.print("\n[yellow]Stopped following log[/yellow]")
@@ -337,59 +450,81 @@ def logs(follow, lines, log_type):
         console.print(f"[red]Error reading log file: {e}[/red]")
 
 
+def _render_monitor(health_future, perf_future, usage_future):
+    """Build the monitor dashboard for one tick from the fetched data."""
+    from rich.console import Group
+    from rich.text import Text
+    
+    lines = [
+        f"[bold]Monitoring Dashboard - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}[/bold]\n"
+    ]
+    
+    # Health status
+    try:
+        health_data = health_future.result()
+        status = health_data['overall_status']
+        status_color = _STATUS_COLOR.get(status, "white")
+        
+        lines.append(Text.assemble("System Status: ", (status, status_color)))
+    except:
+        lines.append("System Status: [red]ERROR[/red]")
+    
+    # Recent performance
+    try:
+        perf_data = perf_future.result()
+        if "total_operations" in perf_data:
+            lines.append(f"Operations (1h): {perf_data['total_operations']}")
+            lines.append(f"Success Rate: {perf_data.get('success_rate', 0):.1%}")
+            lines.append(f"Avg Duration: {perf_data.get('average_duration_seconds', 0):.3f}s")
+    except:
+        lines.append("Performance: [red]ERROR[/red]")
+    
+    # Usage stats
+    try:
+        usage_data = usage_future.result()
+        lines.append(f"Total Conversations: {usage_data['conversations']}")
+        lines.append(f"Total Queries: {usage_data['queries']}")
+        lines.append(f"Total Errors: {usage_data['errors']}")
+    except:
+        lines.append("Usage Stats: [red]ERROR[/red]")
+    
+    lines.append("\n[dim]Refreshing in 5 seconds...[/dim]")
+    return Group(*lines)
+
+
 @cli.command()
 def monitor():
     """Real-time monitoring dashboard."""
     
+    from rich.live import Live
+    console = _get_console()
+    
     console.print("[bold]AI File System Agent - Real-time Monitor[/bold]")
     console.print("Press Ctrl+C to stop monitoring\n")
     
+    # The three data sources are independent, so fetch them concurrently each tick.
+    # Create the shared logger up front so the workers don't race to initialize it.
+    get_diagnostic_logger()
+    
+    def _fetch():
+        return (
+            executor.submit(health_check),
+            executor.submit(get_performance_summary, 1),  # Last hour
+            executor.submit(get_usage_statistics)
+        )
+    
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="monitor")
     try:
-        import time
-        while True:
-            # Clear screen (simple approach)
-            console.clear()
-            
-            console.print(f"[bold]Monitoring Dashboard - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}[/bold]\n")
-            
-            # Health status
-            try:
-                health_data = health_check()
-                status = health_data['overall_status']
-                status_color = {
-                    "HEALTHY": "green",
-                    "DEGRADED": "yellow",
-                    "UNHEALTHY": "red"
-                }.get(status, "white")
-                
-                console.print(f"System Status: [{status_color}]{status}[/{status_color}]")
-            except:
-                console.print("System Status: [red]ERROR[/red]")
-            
-            # Recent performance
-            try:
-                perf_data = get_performance_summary(1)  # Last hour
-                if "total_operations" in perf_data:
-                    console.print(f"Operations (1h): {perf_data['total_operations']}")
-                    console.print(f"Success Rate: {perf_data.get('success_rate', 0):.1%}")
-                    console.print(f"Avg Duration: {perf_data.get('average_duration_seconds', 0):.3f}s")
-            except:
-                console.print("Performance: [red]ERROR[/red]")
-            
-            # Usage stats
-            try:
-                usage_data = get_usage_statistics()
-                console.print(f"Total Conversations: {usage_data['conversations']}")
-                console.print(f"Total Queries: {usage_data['queries']}")
-                console.print(f"Total Errors: {usage_data['errors']}")
-            except:
-                console.print("Usage Stats: [red]ERROR[/red]")
-            
-            console.print("\n[dim]Refreshing in 5 seconds...[/dim]")
-            time.sleep(5)
+        # Live redraws the dashboard region in place instead of clearing the screen
+        with Live(_render_monitor(*_fetch()), console=console, auto_refresh=False) as live:
+            while True:
+                time.sleep(5)
+                live.update(_render_monitor(*_fetch()), refresh=True)
             
     except KeyboardInterrupt:
         console.print("\n[yellow]Monitoring stopped[/yellow]")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == '__main__':
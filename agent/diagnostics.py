@@ -3,20 +3,143 @@ Enhanced diagnostic and monitoring system for the AI File System Agent.
 Provides detailed logging, performance tracking, and usage statistics.
 """
 
+import array
+import atexit
+import heapq
+import itertools
 import logging
+import logging.handlers
+import mmap
 import time
 import json
+import queue
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
-from dataclasses import dataclass, asdict
-from collections import defaultdict, deque
+from dataclasses import dataclass, asdict, field
+from collections import Counter, defaultdict, deque
+from itertools import compress
+from operator import itemgetter
 import psutil
+import structlog
 import os
 
 from config.env_loader import EnvironmentLoader
 
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used otherwise
+    orjson = None
+
+
+def _read_env() -> Dict[str, Any]:
+    """Read the environment settings used by diagnostics."""
+    return {
+        "debug_mode": os.getenv("DEBUG", "false").lower() == "true",
+        "environment": os.getenv("AI_ENVIRONMENT", "unknown"),
+        "python_version": os.getenv("PYTHON_VERSION", "unknown"),
+    }
+
+
+# Environment settings, read once so hot paths never touch os.environ
+_ENV_SETTINGS = _read_env()
+
+
+def refresh_env() -> Dict[str, Any]:
+    """Re-read the diagnostics environment settings, e.g. after loading a .env file."""
+    global _ENV_SETTINGS
+    _ENV_SETTINGS = _read_env()
+    return _ENV_SETTINGS
+
+
+# Last (time_ns, ISO string) pair handed out by _now_iso
+_ts_cache: Tuple[int, str] = (0, "")
+
+
+def _now_iso() -> str:
+    """Return the current local time in ISO format, reusing the string for 1 ms."""
+    global _ts_cache
+    ns = time.time_ns()
+    last_ns, last_iso = _ts_cache
+    if 0 <= ns - last_ns < 1_000_000:
+        return last_iso
+    iso = datetime.fromtimestamp(ns / 1e9).isoformat()
+    _ts_cache = (ns, iso)
+    return iso
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serialize diagnostics data to indented JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2).encode()
+
+
+def _dumps_json_line(obj: Any) -> bytes:
+    """Serialize one record as a compact, newline-terminated JSON line."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, separators=(",", ":")) + "\n").encode()
+
+
+# Process handle and sampled RSS (value in MB, monotonic expiry, pid) shared
+# by all metrics; both are tied to the pid so forked workers measure themselves
+_proc: Optional[psutil.Process] = None
+_RSS_SAMPLE_INTERVAL = 0.25  # seconds
+_rss_cache = [0.0, 0.0, 0]
+
+
+def _current_process() -> psutil.Process:
+    """Return a handle on the current process, re-created when the pid changes (after a fork)."""
+    global _proc
+    if _proc is None or _proc.pid != os.getpid():
+        _proc = psutil.Process()
+    return _proc
+
+
+def _current_rss_mb() -> float:
+    """Return the process RSS in MB, re-sampled at most every ``_RSS_SAMPLE_INTERVAL``."""
+    proc = _current_process()
+    now = time.monotonic()
+    if now > _rss_cache[1] or _rss_cache[2] != proc.pid:
+        _rss_cache[0] = proc.memory_info().rss / 1048576
+        _rss_cache[1] = now + _RSS_SAMPLE_INTERVAL
+        _rss_cache[2] = proc.pid
+    return _rss_cache[0]
+
+
+def tail_lines(path: Path, count: int) -> List[str]:
+    """
+    Return the last ``count`` lines of a file without reading all of it.
+    
+    The file is memory-mapped and scanned backwards for newlines, so only
+    the pages holding the requested tail are touched, however large the
+    log has grown.
+    """
+    if count <= 0:
+        return []
+    
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # A trailing newline terminates the last line rather than starting a new one
+            position = size - 1 if mm[size - 1] == ord('\n') else size
+            start = 0
+            for _ in range(count):
+                newline = mm.rfind(b'\n', 0, position)
+                if newline == -1:
+                    break
+                position = newline
+            else:
+                start = position + 1
+            data = mm[start:size]
+    
+    return data.decode('utf-8', errors='replace').splitlines(keepends=True)[-count:]
+
 
 @dataclass
 class PerformanceMetrics:
@@ -31,14 +154,20 @@ class PerformanceMetrics:
     
     @classmethod
     def create(cls, operation: str, start_time: float, end_time: float, 
-               success: bool, error_message: Optional[str] = None) -> 'PerformanceMetrics':
-        """Create performance metrics with calculated values."""
+               success: bool, error_message: Optional[str] = None,
+               duration_ns: Optional[int] = None) -> 'PerformanceMetrics':
+        """
+        Create performance metrics with calculated values.
+        
+        ``duration_ns`` is a monotonic-clock measurement; when given it is used
+        for ``duration`` instead of the difference of the wallclock times.
+        """
         return cls(
             operation=operation,
             start_time=start_time,
             end_time=end_time,
-            duration=end_time - start_time,
-            memory_usage=psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024,  # MB
+            duration=end_time - start_time if duration_ns is None else duration_ns * 1e-9,
+            memory_usage=_current_rss_mb(),  # MB
             success=success,
             error_message=error_message
         )
@@ -52,14 +181,80 @@ class UsageStatistics:
     tool_calls: int = 0
     errors: int = 0
     avg_response_time: float = 0.0
-    most_used_tools: Dict[str, int] = None
-    error_types: Dict[str, int] = None
+    most_used_tools: Dict[str, int] = field(default_factory=dict)
+    error_types: Dict[str, int] = field(default_factory=dict)
+
+
+# Standard levels of structlog logger method names, for SamplingFilter
+_STRUCTLOG_LEVELS = {
+    "debug": logging.DEBUG, "info": logging.INFO, "msg": logging.INFO,
+    "warning": logging.WARNING, "warn": logging.WARNING,
+    "error": logging.ERROR, "exception": logging.ERROR,
+    "critical": logging.CRITICAL, "fatal": logging.CRITICAL,
+}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Logging filter that thins out high-volume low-level records.
+    
+    Records above ``level`` always pass. Records at or below it pass freely
+    while fewer than ``threshold`` arrive per second; past that, only one in
+    ``every`` is kept for the rest of the second.
     
-    def __post_init__(self):
-        if self.most_used_tools is None:
-            self.most_used_tools = {}
-        if self.error_types is None:
-            self.error_types = {}
+    Works both as a stdlib ``logging.Filter`` and, when called, as a structlog
+    processor that drops sampled-out events.
+    """
+    
+    def __init__(self, every: int = 100, threshold: int = 50, level: int = logging.INFO):
+        super().__init__()
+        self.every = every
+        self.threshold = threshold
+        self.level = level
+        self._window = 0
+        self._seen = 0
+        self._sampled = itertools.count()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self._admit(record.levelno)
+    
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if not self._admit(_STRUCTLOG_LEVELS.get(method_name, logging.CRITICAL)):
+            raise structlog.DropEvent
+        return event_dict
+    
+    def _admit(self, levelno: int) -> bool:
+        """Return True if a record at ``levelno`` should be kept."""
+        if levelno > self.level:
+            return True
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._seen = 0
+        self._seen += 1
+        if self._seen <= self.threshold:
+            return True
+        return next(self._sampled) % self.every == 0
+
+
+# How often the background thread re-samples system memory and disk usage
+_SYSTEM_SAMPLE_INTERVAL = 1.0  # seconds
+
+# How long a performance summary may be reused while no operation has completed
+_SUMMARY_TTL = 0.5  # seconds
+
+# How long a log directory listing may be reused while the directory is unchanged
+_LOG_INFO_TTL = 1.0  # seconds
+
+# Capacity of the in-memory performance ring buffer
+_PERF_CAPACITY = 1000
+
+# Number of lock stripes used for per-tool usage counters
+_TOOL_SHARDS = 16
+
+# Batching limits for the background JSONL flusher
+_JSONL_MAX_BATCH = 256
+_JSONL_FLUSH_INTERVAL = 0.05  # seconds
 
 
 class DiagnosticLogger:
@@ -69,124 +264,250 @@ class DiagnosticLogger:
         self.env = EnvironmentLoader()
         self.log_dir = Path("logs")
         self.log_dir.mkdir(exist_ok=True)
+        refresh_env()
         
         # Set up different loggers for different purposes
         self._setup_loggers()
         
         # Performance and usage tracking
-        self.performance_metrics: deque = deque(maxlen=1000)  # Keep last 1000 operations
         self.usage_stats = UsageStatistics()
-        self.operation_start_times: Dict[str, float] = {}
-        self._lock = threading.Lock()
+        # operation id -> (operation, wallclock start, perf_counter_ns start)
+        self.operation_start_times: Dict[int, Tuple[str, float, int]] = {}
+        self._op_counter = itertools.count(1)
+        self._recent_errors: deque = deque(maxlen=200)
+        self._duration_sum = 0.0
+        self._duration_n = 0
+        self._log_info_cache: Optional[Tuple[float, float, Dict[str, Dict[str, Any]]]] = None
+        # Guards the running duration sum and count, and the error count
+        self._duration_lock = threading.Lock()
+        
+        # Last _PERF_CAPACITY operations, stored column-wise in a ring buffer
+        self._perf_lock = threading.Lock()
+        self._perf_idx = 0
+        self._perf_filled = 0
+        self._perf_writes = 0
+        # (perf writes at compute time, {(hours, top_k): (expiry, summary)})
+        self._summary_cache: Tuple[int, Dict[Tuple[int, int], Tuple[float, Dict[str, Any]]]] = (0, {})
+        self._perf_start = array.array("d", bytes(8 * _PERF_CAPACITY))
+        self._perf_dur_ns = array.array("q", bytes(8 * _PERF_CAPACITY))
+        self._perf_mem = array.array("d", bytes(8 * _PERF_CAPACITY))
+        self._perf_ok = array.array("b", bytes(_PERF_CAPACITY))
+        self._perf_op: List[Optional[str]] = [None] * _PERF_CAPACITY
+        
+        # Hot-path counters: plain ints under small locks; per-tool counts are
+        # striped so concurrent tools rarely contend, and their sum is the
+        # total number of tool calls
+        self._conversation_count = 0
+        self._query_count = 0
+        self._error_count = 0
+        self._count_lock = threading.Lock()
+        self._tool_locks = [threading.Lock() for _ in range(_TOOL_SHARDS)]
+        self._tool_shards = [defaultdict(int) for _ in range(_TOOL_SHARDS)]
+        
+        # JSONL records are queued and written in batches by a background thread
+        self._jsonl_queue: deque = deque()
+        # (memory percent, disk percent, monotonic sample time), refreshed by the flusher
+        self._sys_snapshot: Optional[Tuple[float, float, float]] = None
+        self._flush_event = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name="diagnostics-flusher", daemon=True
+        )
+        self._flush_thread.start()
+        atexit.register(self.flush)
         
     def _setup_loggers(self):
         """Set up structured logging with multiple output files."""
         
         # Main agent logger
         self.agent_logger = logging.getLogger("agent")
-        debug_mode = os.getenv("DEBUG", "false").lower() == "true"
+        debug_mode = _ENV_SETTINGS["debug_mode"]
         self.agent_logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
         
-        # Performance logger
-        self.perf_logger = logging.getLogger("performance")
-        self.perf_logger.setLevel(logging.INFO)
-        
-        # Usage statistics logger
-        self.usage_logger = logging.getLogger("usage")
-        self.usage_logger.setLevel(logging.INFO)
-        
         # Error logger
         self.error_logger = logging.getLogger("errors")
         self.error_logger.setLevel(logging.WARNING)
         
         # Clear existing handlers
-        for logger in [self.agent_logger, self.perf_logger, self.usage_logger, self.error_logger]:
+        for logger in [self.agent_logger, self.error_logger]:
             logger.handlers.clear()
         
         # Create formatters
         detailed_formatter = logging.Formatter(
             '%(asctime)s | %(name)s | %(levelname)s | %(funcName)s:%(lineno)d | %(message)s'
         )
-        json_formatter = logging.Formatter('%(message)s')
+        
+        # File handlers are created with delay=True so a log file is only
+        # opened when its first record is emitted
         
         # Agent activity log (detailed)
-        agent_handler = logging.FileHandler(self.log_dir / "agent_activity.log")
+        agent_handler = logging.FileHandler(self.log_dir / "agent_activity.log", delay=True)
         agent_handler.setFormatter(detailed_formatter)
-        self.agent_logger.addHandler(agent_handler)
+        agent_handler.addFilter(logging.Filter("agent"))
+        sinks = [agent_handler]
         
-        # Performance metrics (JSON)
-        perf_handler = logging.FileHandler(self.log_dir / "performance.jsonl")
-        perf_handler.setFormatter(json_formatter)
-        self.perf_logger.addHandler(perf_handler)
-        
-        # Usage statistics (JSON)
-        usage_handler = logging.FileHandler(self.log_dir / "usage.jsonl")
-        usage_handler.setFormatter(json_formatter)
-        self.usage_logger.addHandler(usage_handler)
+        # Performance metrics and usage statistics (JSONL) bypass the logging
+        # module; the background flusher opens these descriptors on first write
+        self._jsonl_fds: Dict[str, int] = {}
         
         # Error log (detailed)
-        error_handler = logging.FileHandler(self.log_dir / "errors.log")
+        error_handler = logging.FileHandler(self.log_dir / "errors.log", delay=True)
         error_handler.setFormatter(detailed_formatter)
-        self.error_logger.addHandler(error_handler)
+        error_handler.addFilter(logging.Filter("errors"))
+        sinks.append(error_handler)
         
         # Console output for debug mode
-        debug_mode = os.getenv("DEBUG", "false").lower() == "true"
         if debug_mode:
             console_handler = logging.StreamHandler()
             console_handler.setFormatter(detailed_formatter)
             console_handler.setLevel(logging.DEBUG)
-            self.agent_logger.addHandler(console_handler)
+            console_handler.addFilter(logging.Filter("agent"))
+            sinks.append(console_handler)
+        
+        # Both loggers only enqueue records; a listener thread does the file and
+        # console I/O, routing each record to its sinks by logger-name filter
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        for logger in [self.agent_logger, self.error_logger]:
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue, *sinks, respect_handler_level=True
+        )
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)
     
-    def start_operation(self, operation: str, context: Dict[str, Any] = None) -> str:
-        """Start tracking an operation."""
-        operation_id = f"{operation}_{int(time.time() * 1000)}"
-        
-        with self._lock:
-            self.operation_start_times[operation_id] = time.time()
+    def _write_jsonl(self, stream: str, record: Dict[str, Any]) -> None:
+        """Serialize a JSONL record and queue it for the background flusher."""
+        self._jsonl_queue.append((stream, _dumps_json_line(record)))
+        if len(self._jsonl_queue) >= _JSONL_MAX_BATCH:
+            self._flush_event.set()
+    
+    def _flush_loop(self) -> None:
+        """
+        Background thread: flush queued JSONL records periodically or when a
+        batch fills, and refresh the system resource snapshot once a second.
+        """
+        next_sample = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= next_sample:
+                next_sample = now + _SYSTEM_SAMPLE_INTERVAL
+                try:
+                    self._sample_system_resources()
+                except Exception:
+                    pass
+            
+            self._flush_event.wait(_JSONL_FLUSH_INTERVAL)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Never let a write failure kill the flusher thread
+                pass
+    
+    def _sample_system_resources(self) -> Tuple[float, float, float]:
+        """Sample memory and disk usage and publish them as the current snapshot."""
+        snapshot = (
+            psutil.virtual_memory().percent,
+            psutil.disk_usage('.').percent,
+            time.monotonic()
+        )
+        self._sys_snapshot = snapshot
+        return snapshot
+    
+    def flush(self) -> None:
+        """Write all queued JSONL records to disk, one write per stream per batch."""
+        with self._flush_lock:
+            while self._jsonl_queue:
+                batches: Dict[str, List[bytes]] = defaultdict(list)
+                for _ in range(min(_JSONL_MAX_BATCH, len(self._jsonl_queue))):
+                    stream, line = self._jsonl_queue.popleft()
+                    batches[stream].append(line)
+                
+                for stream, lines in batches.items():
+                    data = b"".join(lines)
+                    fd = self._jsonl_fds.get(stream)
+                    if fd is None:
+                        fd = self._jsonl_fds[stream] = os.open(
+                            self.log_dir / f"{stream}.jsonl",
+                            os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+                        )
+                    while data:
+                        written = os.write(fd, data)
+                        data = data[written:]
+    
+    def start_operation(self, operation: str, context: Dict[str, Any] = None) -> int:
+        """Start tracking an operation and return its integer id."""
+        operation_id = next(self._op_counter)
+        
+        # Ids are unique and single dict stores/pops are atomic under the GIL,
+        # so the start-time map needs no lock
+        self.operation_start_times[operation_id] = (
+            operation, time.time(), time.perf_counter_ns()
+        )
         
-        context_str = f" | Context: {json.dumps(context)}" if context else ""
-        self.agent_logger.info(f"OPERATION_START | {operation} | ID: {operation_id}{context_str}")
+        if self.agent_logger.isEnabledFor(logging.INFO):
+            context_str = f" | Context: {json.dumps(context)}" if context else ""
+            self.agent_logger.info(f"OPERATION_START | {operation} | ID: {operation_id}{context_str}")
         
         return operation_id
     
-    def end_operation(self, operation_id: str, success: bool = True, 
+    def end_operation(self, operation_id: int, success: bool = True, 
                      error_message: Optional[str] = None, result_summary: Optional[str] = None):
         """End tracking an operation and record metrics."""
-        
-        with self._lock:
-            start_time = self.operation_start_times.pop(operation_id, time.time())
-            
+        end_ns = time.perf_counter_ns()
         end_time = time.time()
-        operation = operation_id.split('_')[0]
         
-        # Create performance metrics
+        operation, start_time, start_ns = self.operation_start_times.pop(
+            operation_id, ("unknown", end_time, end_ns)
+        )
+        
+        # Durations come from the monotonic clock; wallclock times are kept
+        # only for timestamps and the summary's time window
+        duration_ns = end_ns - start_ns
         metrics = PerformanceMetrics.create(
             operation=operation,
             start_time=start_time,
             end_time=end_time,
             success=success,
-            error_message=error_message
+            error_message=error_message,
+            duration_ns=duration_ns
         )
         
         # Store metrics
-        self.performance_metrics.append(metrics)
+        with self._perf_lock:
+            i = self._perf_idx
+            self._perf_start[i] = metrics.start_time
+            self._perf_dur_ns[i] = duration_ns
+            self._perf_mem[i] = metrics.memory_usage
+            self._perf_ok[i] = bool(metrics.success)
+            self._perf_op[i] = metrics.operation
+            self._perf_idx = (i + 1) % _PERF_CAPACITY
+            self._perf_filled = min(self._perf_filled + 1, _PERF_CAPACITY)
+            self._perf_writes += 1
         
         # Log performance data
         perf_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _now_iso(),
             "operation_id": operation_id,
-            **asdict(metrics)
+            "operation": metrics.operation,
+            "start_time": metrics.start_time,
+            "end_time": metrics.end_time,
+            "duration": metrics.duration,
+            "memory_usage": metrics.memory_usage,
+            "success": metrics.success,
+            "error_message": metrics.error_message
         }
-        self.perf_logger.info(json.dumps(perf_data))
+        self._write_jsonl("performance", perf_data)
         
         # Log operation end
-        status = "SUCCESS" if success else "FAILURE"
-        result_str = f" | Result: {result_summary}" if result_summary else ""
-        error_str = f" | Error: {error_message}" if error_message else ""
-        self.agent_logger.info(
-            f"OPERATION_END | {operation} | ID: {operation_id} | Status: {status} | "
-            f"Duration: {metrics.duration:.3f}s{result_str}{error_str}"
-        )
+        if self.agent_logger.isEnabledFor(logging.INFO):
+            status = "SUCCESS" if success else "FAILURE"
+            result_str = f" | Result: {result_summary}" if result_summary else ""
+            error_str = f" | Error: {error_message}" if error_message else ""
+            self.agent_logger.info(
+                f"OPERATION_END | {operation} | ID: {operation_id} | Status: {status} | "
+                f"Duration: {metrics.duration:.3f}s{result_str}{error_str}"
+            )
         
         # Update usage statistics
         self._update_usage_stats(operation, success, metrics.duration)
@@ -194,38 +515,46 @@ class DiagnosticLogger:
         # Log errors separately
         if not success and error_message:
             self.error_logger.error(f"{operation} | {operation_id} | {error_message}")
+            self._recent_errors.append({
+                "timestamp": perf_data["timestamp"],
+                "operation": operation,
+                "operation_id": operation_id,
+                "error": error_message
+            })
     
     def log_conversation_start(self, conversation_id: str, user_query: str):
         """Log the start of a new conversation."""
-        with self._lock:
-            self.usage_stats.conversations += 1
-            self.usage_stats.queries += 1
+        with self._count_lock:
+            self._conversation_count += 1
+            self._query_count += 1
         
-        self.agent_logger.info(f"CONVERSATION_START | ID: {conversation_id} | Query: {user_query[:100]}...")
+        self.agent_logger.info(
+            "CONVERSATION_START | ID: %s | Query: %s...", conversation_id, user_query[:100]
+        )
         
         # Log usage update
         usage_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _now_iso(),
             "event": "conversation_start",
             "conversation_id": conversation_id,
             "query_preview": user_query[:100]
         }
-        self.usage_logger.info(json.dumps(usage_data))
+        self._write_jsonl("usage", usage_data)
     
     def log_tool_usage(self, tool_name: str, parameters: Dict[str, Any] = None):
         """Log tool usage for statistics."""
-        with self._lock:
-            self.usage_stats.tool_calls += 1
-            if tool_name not in self.usage_stats.most_used_tools:
-                self.usage_stats.most_used_tools[tool_name] = 0
-            self.usage_stats.most_used_tools[tool_name] += 1
-        
-        params_str = f" | Params: {json.dumps(parameters)}" if parameters else ""
-        self.agent_logger.debug(f"TOOL_USAGE | {tool_name}{params_str}")
+        shard = hash(tool_name) & (_TOOL_SHARDS - 1)
+        with self._tool_locks[shard]:
+            self._tool_shards[shard][tool_name] += 1
+        
+        # Skip serializing parameters unless the DEBUG record will be emitted
+        if self.agent_logger.isEnabledFor(logging.DEBUG):
+            params_str = f" | Params: {json.dumps(parameters)}" if parameters else ""
+            self.agent_logger.debug(f"TOOL_USAGE | {tool_name}{params_str}")
     
     def log_security_event(self, event_type: str, details: Dict[str, Any], severity: str = "WARNING"):
         """Log security-related events."""
-        timestamp = datetime.now().isoformat()
+        timestamp = _now_iso()
         
         security_data = {
             "timestamp": timestamp,
@@ -235,122 +564,229 @@ class DiagnosticLogger:
         }
         
         log_level = getattr(logging, severity)
-        self.error_logger.log(log_level, f"SECURITY_EVENT | {event_type} | {json.dumps(details)}")
+        if self.error_logger.isEnabledFor(log_level):
+            self.error_logger.log(log_level, f"SECURITY_EVENT | {event_type} | {json.dumps(details)}")
+        
+        # Like errors.log, the recent errors ring only keeps warnings and above,
+        # so routine INFO events (e.g. approvals) cannot push real errors out
+        if log_level >= logging.WARNING:
+            self._recent_errors.append(security_data)
         
         # Also log to usage for statistics
-        self.usage_logger.info(json.dumps({
+        self._write_jsonl("usage", {
             "timestamp": timestamp,
             "event": "security_event",
             "type": event_type,
             "severity": severity
-        }))
+        })
     
     def _update_usage_stats(self, operation: str, success: bool, duration: float):
         """Update internal usage statistics."""
-        with self._lock:
+        # The average response time is derived from these on read
+        with self._duration_lock:
             if not success:
-                self.usage_stats.errors += 1
-            
-            # Update average response time
-            current_avg = self.usage_stats.avg_response_time
-            total_ops = len(self.performance_metrics)
-            if total_ops > 0:
-                self.usage_stats.avg_response_time = (
-                    (current_avg * (total_ops - 1) + duration) / total_ops
-                )
+                self._error_count += 1
+            self._duration_sum += duration
+            self._duration_n += 1
     
-    def get_performance_summary(self, hours: int = 24) -> Dict[str, Any]:
-        """Get performance summary for the last N hours."""
+    def get_performance_summary(self, hours: int = 24, top_k: int = 5) -> Dict[str, Any]:
+        """
+        Get performance summary for the last N hours.
+        
+        Back-to-back callers (e.g. ``health_check`` and an export in the same
+        monitoring tick) share one scan: a summary is reused for up to
+        ``_SUMMARY_TTL`` seconds as long as no operation has been recorded.
+        """
+        now = time.monotonic()
+        key = (hours, top_k)
+        writes, entries = self._summary_cache
+        if writes == self._perf_writes:
+            hit = entries.get(key)
+            if hit is not None and now < hit[0]:
+                return hit[1]
+        
+        writes, summary = self._compute_performance_summary(hours, top_k)
+        cached_writes, entries = self._summary_cache
+        if cached_writes != writes:
+            entries = {}
+        entries[key] = (now + _SUMMARY_TTL, summary)
+        self._summary_cache = (writes, entries)
+        return summary
+    
+    def _compute_performance_summary(self, hours: int, top_k: int) -> Tuple[int, Dict[str, Any]]:
+        """
+        Scan the ring buffer and return ``(perf writes, summary)``.
+        
+        The ring buffer columns are filtered with a time-window mask and
+        reduced with C-level builtins, and only the ``top_k`` slowest
+        operations are selected rather than sorting the whole window.
+        """
         cutoff_time = time.time() - (hours * 3600)
         
-        recent_metrics = [m for m in self.performance_metrics if m.start_time >= cutoff_time]
-        
-        if not recent_metrics:
-            return {"message": "No recent performance data"}
-        
-        total_operations = len(recent_metrics)
-        successful_operations = sum(1 for m in recent_metrics if m.success)
-        avg_duration = sum(m.duration for m in recent_metrics) / total_operations
-        avg_memory = sum(m.memory_usage for m in recent_metrics) / total_operations
-        
-        operation_counts = defaultdict(int)
-        for m in recent_metrics:
-            operation_counts[m.operation] += 1
+        with self._perf_lock:
+            writes = self._perf_writes
+            n = self._perf_filled
+            starts = self._perf_start[:n]
+            durations = self._perf_dur_ns[:n]
+            memory = self._perf_mem[:n]
+            ok = self._perf_ok[:n]
+            operations = self._perf_op[:n]
+        
+        mask = list(map(cutoff_time.__le__, starts))
+        total_operations = sum(mask)
+        if not total_operations:
+            return writes, {"message": "No recent performance data"}
+        
+        recent_durations = list(compress(durations, mask))
+        recent_operations = list(compress(operations, mask))
+        successful_operations = sum(compress(ok, mask))
+        total_duration = sum(recent_durations) * 1e-9
+        total_memory = sum(compress(memory, mask))
+        operation_counts = Counter(recent_operations)
+        slowest = heapq.nlargest(
+            top_k, range(total_operations), key=recent_durations.__getitem__
+        )
         
-        return {
+        return writes, {
             "time_period_hours": hours,
             "total_operations": total_operations,
             "successful_operations": successful_operations,
             "success_rate": successful_operations / total_operations,
-            "average_duration_seconds": round(avg_duration, 3),
-            "average_memory_mb": round(avg_memory, 2),
+            "average_duration_seconds": round(total_duration / total_operations, 3),
+            "average_memory_mb": round(total_memory / total_operations, 2),
             "operations_by_type": dict(operation_counts),
             "slowest_operations": [
-                {"operation": m.operation, "duration": m.duration}
-                for m in sorted(recent_metrics, key=lambda x: x.duration, reverse=True)[:5]
+                {"operation": recent_operations[i], "duration": recent_durations[i] * 1e-9}
+                for i in slowest
             ]
         }
     
     def get_usage_statistics(self) -> Dict[str, Any]:
         """Get current usage statistics."""
-        with self._lock:
-            return {
-                "statistics_as_of": datetime.now().isoformat(),
-                **asdict(self.usage_stats),
-                "top_tools": sorted(
-                    self.usage_stats.most_used_tools.items(),
-                    key=lambda x: x[1],
-                    reverse=True
-                )[:10],
-                "error_breakdown": dict(self.usage_stats.error_types)
-            }
+        most_used_tools: Dict[str, int] = {}
+        for lock, shard in zip(self._tool_locks, self._tool_shards):
+            with lock:
+                most_used_tools.update(shard)
+        
+        with self._duration_lock:
+            duration_sum, duration_n, errors = self._duration_sum, self._duration_n, self._error_count
+        with self._count_lock:
+            conversations, queries = self._conversation_count, self._query_count
+        
+        stats = UsageStatistics(
+            conversations=conversations,
+            queries=queries,
+            tool_calls=sum(most_used_tools.values()),
+            errors=errors,
+            avg_response_time=duration_sum / duration_n if duration_n else 0.0,
+            most_used_tools=most_used_tools,
+            error_types=dict(self.usage_stats.error_types),
+        )
+        
+        return {
+            "statistics_as_of": _now_iso(),
+            **asdict(stats),
+            "top_tools": heapq.nlargest(10, most_used_tools.items(), key=itemgetter(1)),
+            "error_breakdown": stats.error_types
+        }
     
-    def export_diagnostics(self, output_file: Optional[Path] = None) -> Path:
-        """Export comprehensive diagnostics to a file."""
+    def export_diagnostics(self, output_file: Optional[Path] = None,
+                           output_format: str = "json") -> Path:
+        """
+        Export comprehensive diagnostics to a file.
+        
+        ``output_format`` is either ``"json"`` (a single indented document) or
+        ``"ndjson"`` (one compact record per line, written as each record is
+        produced so the whole export is never held in memory at once).
+        """
+        if output_format not in ("json", "ndjson"):
+            raise ValueError(f"Unsupported diagnostics export format: {output_format}")
+        
         if output_file is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = self.log_dir / f"diagnostics_{timestamp}.json"
-        
-        diagnostics = {
-            "export_timestamp": datetime.now().isoformat(),
-            "system_info": {
-                "python_version": os.getenv("PYTHON_VERSION", "unknown"),
-                "environment": os.getenv("AI_ENVIRONMENT", "unknown"),
-                "debug_mode": os.getenv("DEBUG", "false").lower() == "true",
-                "process_id": os.getpid(),
-                "memory_usage_mb": psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
-            },
-            "performance_summary": self.get_performance_summary(),
-            "usage_statistics": self.get_usage_statistics(),
-            "recent_errors": self._get_recent_errors(),
-            "log_file_sizes": self._get_log_file_info()
-        }
-        
-        with open(output_file, 'w') as f:
-            json.dump(diagnostics, f, indent=2)
+            output_file = self.log_dir / f"diagnostics_{timestamp}.{output_format}"
+        
+        if output_format == "ndjson":
+            with open(output_file, 'wb') as f:
+                for record in self.iter_diagnostics():
+                    f.write(_dumps_json_line(record))
+        else:
+            diagnostics = {
+                "export_timestamp": datetime.now().isoformat(),
+                "system_info": self._get_system_info(),
+                "performance_summary": self.get_performance_summary(),
+                "usage_statistics": self.get_usage_statistics(),
+                "recent_errors": self._get_recent_errors(),
+                "log_file_sizes": self._get_log_file_info()
+            }
+            Path(output_file).write_bytes(dumps_json(diagnostics))
         
         self.agent_logger.info(f"Diagnostics exported to {output_file}")
         return output_file
     
+    def iter_diagnostics(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the diagnostics export one record at a time.
+        
+        Each record carries a ``record`` field naming its section; recent
+        errors and log files are yielded as one record per item.
+        """
+        yield {"record": "export", "export_timestamp": datetime.now().isoformat()}
+        yield {"record": "system_info", **self._get_system_info()}
+        yield {"record": "performance_summary", **self.get_performance_summary()}
+        yield {"record": "usage_statistics", **self.get_usage_statistics()}
+        for error in self._get_recent_errors():
+            yield {"record": "recent_error", **error}
+        for name, info in self._get_log_file_info().items():
+            yield {"record": "log_file", "name": name, **info}
+    
+    def _get_system_info(self) -> Dict[str, Any]:
+        """Get process and environment information for exports."""
+        return {
+            "python_version": _ENV_SETTINGS["python_version"],
+            "environment": _ENV_SETTINGS["environment"],
+            "debug_mode": _ENV_SETTINGS["debug_mode"],
+            "process_id": os.getpid(),
+            "memory_usage_mb": _current_process().memory_info().rss / 1024 / 1024
+        }
+    
     def _get_recent_errors(self, count: int = 10) -> List[Dict[str, Any]]:
-        """Get recent error information."""
-        recent_errors = []
+        """
+        Get the most recent errors, oldest first.
+        
+        Served from the in-memory ring filled by ``end_operation`` and
+        ``log_security_event``. Only when the ring is empty, e.g. right after
+        a restart, is the tail of ``errors.log`` read instead.
+        """
+        recent_errors = list(self._recent_errors)
+        if recent_errors:
+            return recent_errors[-count:]
+        
+        # Nothing recorded since startup: fall back to the tail of the log file
         error_log_file = self.log_dir / "errors.log"
-        
         if error_log_file.exists():
             try:
-                with open(error_log_file, 'r') as f:
-                    lines = f.readlines()
-                    for line in lines[-count:]:
-                        if line.strip():
-                            recent_errors.append({"error_log": line.strip()})
+                for line in tail_lines(error_log_file, count):
+                    if line.strip():
+                        recent_errors.append({"error_log": line.strip()})
             except Exception as e:
                 recent_errors.append({"error": f"Could not read error log: {e}"})
         
         return recent_errors
     
     def _get_log_file_info(self) -> Dict[str, Dict[str, Any]]:
-        """Get information about log files."""
+        """
+        Get information about log files.
+        
+        The result is reused for up to ``_LOG_INFO_TTL`` seconds as long as the
+        log directory's mtime is unchanged, i.e. no file was added or removed.
+        """
+        now = time.monotonic()
+        dir_mtime = self.log_dir.stat().st_mtime
+        cached = self._log_info_cache
+        if cached is not None and cached[0] == dir_mtime and now < cached[1]:
+            return cached[2]
+        
         log_info = {}
         
         for log_file in self.log_dir.glob("*.log*"):
@@ -364,6 +800,7 @@ class DiagnosticLogger:
             except Exception as e:
                 log_info[log_file.name] = {"error": str(e)}
         
+        self._log_info_cache = (dir_mtime, now + _LOG_INFO_TTL, log_info)
         return log_info
     
     def health_check(self) -> Dict[str, Any]:
@@ -409,15 +846,16 @@ class DiagnosticLogger:
                 "error": str(e)
             }
         
-        # Check system resources
+        # Check system resources, read from the flusher thread's latest sample
         try:
-            memory_percent = psutil.virtual_memory().percent
-            disk_percent = psutil.disk_usage('.').percent
+            snapshot = self._sys_snapshot or self._sample_system_resources()
+            memory_percent, disk_percent, sampled_at = snapshot
             
             health_status["components"]["system_resources"] = {
                 "status": "HEALTHY" if memory_percent < 80 and disk_percent < 90 else "DEGRADED",
                 "memory_usage_percent": memory_percent,
-                "disk_usage_percent": disk_percent
+                "disk_usage_percent": disk_percent,
+                "sample_age_seconds": round(time.monotonic() - sampled_at, 3)
             }
             
             if memory_percent > 95 or disk_percent > 95:
@@ -445,12 +883,12 @@ def get_diagnostic_logger() -> DiagnosticLogger:
 
 
 # Convenience functions
-def start_operation(operation: str, context: Dict[str, Any] = None) -> str:
+def start_operation(operation: str, context: Dict[str, Any] = None) -> int:
     """Start tracking an operation."""
     return get_diagnostic_logger().start_operation(operation, context)
 
 
-def end_operation(operation_id: str, success: bool = True, 
+def end_operation(operation_id: int, success: bool = True, 
                  error_message: Optional[str] = None, result_summary: Optional[str] = None):
     """End tracking an operation."""
     get_diagnostic_logger().end_operation(operation_id, success, error_message, result_summary)
@@ -471,9 +909,9 @@ def log_security_event(event_type: str, details: Dict[str, Any], severity: str =
     get_diagnostic_logger().log_security_event(event_type, details, severity)
 
 
-def get_performance_summary(hours: int = 24) -> Dict[str, Any]:
+def get_performance_summary(hours: int = 24, top_k: int = 5) -> Dict[str, Any]:
     """Get performance summary."""
-    return get_diagnostic_logger().get_performance_summary(hours)
+    return get_diagnostic_logger().get_performance_summary(hours, top_k)
 
 
 def get_usage_statistics() -> Dict[str, Any]:
@@ -481,11 +919,26 @@ def get_usage_statistics() -> Dict[str, Any]:
     return get_diagnostic_logger().get_usage_statistics()
 
 
-def export_diagnostics(output_file: Optional[Path] = None) -> Path:
+def get_performance_summary_json(hours: int = 24, top_k: int = 5) -> bytes:
+    """Get performance summary serialized as JSON bytes."""
+    return dumps_json(get_performance_summary(hours, top_k))
+
+
+def get_usage_statistics_json() -> bytes:
+    """Get usage statistics serialized as JSON bytes."""
+    return dumps_json(get_usage_statistics())
+
+
+def export_diagnostics(output_file: Optional[Path] = None, output_format: str = "json") -> Path:
     """Export diagnostics."""
-    return get_diagnostic_logger().export_diagnostics(output_file)
+    return get_diagnostic_logger().export_diagnostics(output_file, output_format)
 
 
 def health_check() -> Dict[str, Any]:
     """Perform health check."""
     return get_diagnostic_logger().health_check()
+
+
+def health_check_json() -> bytes:
+    """Perform health check and serialize the result as JSON bytes."""
+    return dumps_json(health_check())
@@ -123,7 +123,6 @@ async def demo_message_processing():
         # Test rejection scenario
         print("🚫 Testing request rejection...")
         mock_supervisor.moderate_request = AsyncMock(return_value=ModerationResponse(
-            conversation_id="demo-1",
             decision=ModerationDecision.REJECTED,
             allowed=False,
             reason="Request contains potentially harmful content",
@@ -142,7 +141,6 @@ async def demo_message_processing():
         # Test approval scenario
         print("\n✅ Testing request approval...")
         mock_supervisor.moderate_request = AsyncMock(return_value=ModerationResponse(
-            conversation_id="demo-2",
             decision=ModerationDecision.ALLOWED,
             allowed=True,
             reason="Safe file operation request",
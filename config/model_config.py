@@ -22,6 +22,10 @@ from .exceptions import (
     ProviderNotFoundError,
 )
 
+# Providers pydantic-ai accepts as model name prefixes; others go through
+# its OpenAI-compatible client
+_PYDANTIC_AI_PROVIDERS = frozenset({"openai", "anthropic", "gemini", "groq"})
+
 
 @dataclass
 class ProviderConfig:
@@ -74,6 +78,13 @@ class ModelProvider:
     model_name: str
     config: ProviderConfig
     
+    @property
+    def pydantic_ai_provider(self) -> str:
+        """Provider prefix to use in pydantic-ai model names."""
+        if self.provider_name in _PYDANTIC_AI_PROVIDERS:
+            return self.provider_name
+        return "openai"
+    
     def get_client_params(self) -> Dict[str, Any]:
         """
         Get parameters for initializing the LLM client.
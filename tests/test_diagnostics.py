@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+import agent.diagnostics as diagnostics_module
+from agent.diagnostics import DiagnosticLogger, _current_rss_mb, tail_lines
+
+# ---------------------------
+# tail_lines Tests
+# ---------------------------
+
+@pytest.mark.parametrize("count", [1, 3, 10])
+def test_tail_lines_matches_reading_the_whole_file(tmp_path, count):
+    log_file = tmp_path / "agent.log"
+    lines = [f"line {i}\n" for i in range(10)]
+    log_file.write_text("".join(lines))
+    assert tail_lines(log_file, count) == lines[-count:]
+
+
+def test_tail_lines_more_than_available_returns_everything(tmp_path):
+    log_file = tmp_path / "agent.log"
+    log_file.write_text("first\nsecond\n")
+    assert tail_lines(log_file, 50) == ["first\n", "second\n"]
+
+
+def test_tail_lines_without_trailing_newline(tmp_path):
+    log_file = tmp_path / "agent.log"
+    log_file.write_text("first\nsecond\nthird")
+    assert tail_lines(log_file, 2) == ["second\n", "third"]
+
+
+def test_tail_lines_empty_file_and_zero_count(tmp_path):
+    log_file = tmp_path / "agent.log"
+    log_file.write_text("")
+    assert tail_lines(log_file, 5) == []
+    log_file.write_text("only\n")
+    assert tail_lines(log_file, 0) == []
+
+
+def test_tail_lines_keeps_blank_lines_and_decodes_utf8(tmp_path):
+    log_file = tmp_path / "agent.log"
+    log_file.write_text("a\n\nnaïve ✓\n", encoding="utf-8")
+    assert tail_lines(log_file, 2) == ["\n", "naïve ✓\n"]
+
+# ---------------------------
+# DiagnosticLogger Tests
+# ---------------------------
+
+def test_info_security_events_do_not_evict_recent_errors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    diagnostics = DiagnosticLogger()
+    operation_id = diagnostics.start_operation("read_file")
+    diagnostics.end_operation(operation_id, success=False, error_message="disk on fire")
+    for i in range(12):
+        diagnostics.log_security_event("request_approved", {"conversation_id": str(i)}, severity="INFO")
+    diagnostics.log_security_event("request_rejected", {"conversation_id": "x"})
+
+    recent = diagnostics._get_recent_errors()
+    assert [e.get("error") for e in recent][0] == "disk on fire"
+    assert [e.get("event_type") for e in recent][1:] == ["request_rejected"]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_worker_measures_its_own_process():
+    _current_rss_mb()  # Prime the parent's handle and sample
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # Child: report the pid its handle points at, then exit
+        try:
+            _current_rss_mb()
+            os.write(write_end, str(diagnostics_module._current_process().pid).encode())
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    assert int(os.read(read_end, 32)) == pid
+    os.close(read_end)
@@ -0,0 +1,398 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+import agent.supervisor.supervisor as supervisor_module
+from agent.supervisor.supervisor import (
+    ModerationDecision,
+    ModerationRequest,
+    RequestSupervisor,
+    _TokenBucket,
+    _looks_english,
+)
+
+# ---------------------------
+# Helpers
+# ---------------------------
+
+class StubResult:
+    """Minimal stand-in for a pydantic-ai run result."""
+
+    def __init__(self, data):
+        self.data = data
+
+
+class StubAgent:
+    """Supervision agent stub that records prompts and replies with canned JSON."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def run(self, prompt):
+        self.prompts.append(prompt)
+        reply = self.reply(prompt)
+        return StubResult(reply if isinstance(reply, str) else json.dumps(reply))
+
+
+def decision(allowed=True, reason="ok", **extra):
+    return {
+        "decision": "allowed" if allowed else "rejected",
+        "allowed": allowed,
+        "reason": reason,
+        "risk_factors": [],
+        **extra,
+    }
+
+
+def batch_ids(prompt):
+    return [int(number) for number in re.findall(r"^(\d+)\. ", prompt, re.MULTILINE)]
+
+
+def make_request(query, conversation_id="cid", context=None):
+    return ModerationRequest(user_query=query, conversation_id=conversation_id, conversation_context=context)
+
+
+class StubStream:
+    """Streamed run stub that counts how many chunks were consumed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def stream_text(self, delta=False, debounce_by=None):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+
+class StubStreamingAgent(StubAgent):
+    """Supervision agent stub that streams its reply in fixed chunks."""
+
+    def __init__(self, chunks):
+        super().__init__(lambda p: "".join(chunks))
+        self.stream = StubStream(chunks)
+
+    def run_stream(self, prompt):
+        self.prompts.append(prompt)
+        return self.stream
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+@pytest.fixture(autouse=True)
+def offline_agents(monkeypatch):
+    """Keep every agent offline: translations echo the text back."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    translator = StubAgent(lambda p: p.split(": ", 1)[1])
+    monkeypatch.setattr(supervisor_module, "_get_agent", lambda *args: translator)
+    return translator
+
+
+@pytest.fixture
+def supervisor():
+    return RequestSupervisor()
+
+
+def prepared(supervisor, queries):
+    return [
+        (index, make_request(query), query, supervisor.filter_content(query))
+        for index, query in enumerate(queries)
+    ]
+
+# ---------------------------
+# Batching
+# ---------------------------
+
+@pytest.mark.asyncio
+async def test_batch_reply_is_split_by_id(supervisor):
+    supervisor.agent = StubAgent(lambda p: [decision(reason=f"answer {i}", id=i) for i in reversed(batch_ids(p))])
+    queries = ["what is in the project", "what does this folder hold", "how big is the readme"]
+    responses = [None] * len(queries)
+    await supervisor._moderate_batch(prepared(supervisor, queries), responses)
+    assert len(supervisor.agent.prompts) == 1
+    assert [r.reason for r in responses] == ["answer 1", "answer 2", "answer 3"]
+
+
+
+@pytest.mark.asyncio
+async def test_batch_reply_with_string_ids_is_split_by_id(supervisor):
+    supervisor.agent = StubAgent(lambda p: [decision(reason=f"answer {i}", id=str(i)) for i in batch_ids(p)])
+    queries = ["what is in the project", "what does this folder hold"]
+    responses = [None] * len(queries)
+    await supervisor._moderate_batch(prepared(supervisor, queries), responses)
+    assert [r.reason for r in responses] == ["answer 1", "answer 2"]
+
+
+@pytest.mark.asyncio
+async def test_batch_reply_with_missing_and_invalid_items_falls_back(supervisor):
+    supervisor.agent = StubAgent(lambda p: [decision(reason="first", id=1), "not a decision", 7, decision(id=9), decision(id="two")])
+    queries = ["what is in the project", "what does this folder hold"]
+    responses = [None] * len(queries)
+    await supervisor._moderate_batch(prepared(supervisor, queries), responses)
+    assert responses[0].reason == "first"
+    assert responses[1].reason.startswith("Enhanced rule-based moderation")
+
+
+@pytest.mark.asyncio
+async def test_batch_reply_that_is_not_an_array_falls_back(supervisor):
+    supervisor.agent = StubAgent(lambda p: decision(reason="single object"))
+    queries = ["what is in the project", "what does this folder hold"]
+    responses = [None] * len(queries)
+    await supervisor._moderate_batch(prepared(supervisor, queries), responses)
+    assert all(r.reason.startswith("Enhanced rule-based moderation") for r in responses)
+
+
+@pytest.mark.asyncio
+async def test_dynamic_batcher_resolves_each_caller_and_fills_caches():
+    supervisor = RequestSupervisor(batch_window=0.05)
+    supervisor.agent = StubAgent(lambda p: [decision(reason=f"answer {i}", id=i) for i in batch_ids(p)])
+    queries = ["what is in the project folder", "what is in the docs folder", "what is in the tests folder"]
+
+    responses = await asyncio.gather(*(supervisor.moderate_request(make_request(q)) for q in queries))
+    assert len(supervisor.agent.prompts) == 1
+    assert sorted(r.reason for r in responses) == ["answer 1", "answer 2", "answer 3"]
+    assert all(r.decision is ModerationDecision.ALLOWED for r in responses)
+
+    # Batched decisions are cached like single ones
+    again = await asyncio.gather(*(supervisor.moderate_request(make_request(q)) for q in queries))
+    assert len(supervisor.agent.prompts) == 1
+    assert [r.reason for r in again] == [r.reason for r in responses]
+    assert supervisor.get_cache_stats()["size"] == len(queries)
+
+
+@pytest.mark.asyncio
+async def test_moderate_requests_sends_one_call_per_batch(supervisor):
+    supervisor.agent = StubAgent(lambda p: [decision(reason=f"answer {i}", id=i) for i in batch_ids(p)])
+    queries = [f"what is in the folder number {i}" for i in range(5)]
+    responses = await supervisor.moderate_requests([make_request(q) for q in queries], batch_size=2)
+    assert len(supervisor.agent.prompts) == 3
+    assert [r.reason for r in responses] == ["answer 1", "answer 2", "answer 1", "answer 2", "answer 1"]
+
+# ---------------------------
+# Caching
+# ---------------------------
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_served_from_cache(supervisor):
+    supervisor.agent = StubAgent(lambda p: decision())
+    await supervisor.moderate_request(make_request("What is in the project folder", "a"))
+    cached = await supervisor.moderate_request(make_request("what is in   the project folder", "b"))
+    assert cached.allowed
+    assert len(supervisor.agent.prompts) == 1
+    assert supervisor.get_cache_stats()["response_hits"] == 1
+
+    await supervisor.moderate_request(make_request("what is in the project folder", "c"), cache_bust=True)
+    assert len(supervisor.agent.prompts) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_approval_is_logged_for_each_conversation(supervisor, monkeypatch):
+    events = []
+    monkeypatch.setattr(supervisor_module, "_log_security_event_later", lambda **event: events.append(event))
+    supervisor.agent = StubAgent(lambda p: decision())
+    await supervisor.moderate_request(make_request("what is in the project folder", "a"))
+    await supervisor.moderate_request(make_request("what is in the project folder", "b"))
+    approvals = [e["details"] for e in events if e["event_type"] == "request_approved"]
+    assert [d["conversation_id"] for d in approvals] == ["a", "b"]
+    assert approvals[1]["cached"] is True
+
+
+@pytest.mark.asyncio
+async def test_review_decisions_are_not_cached(supervisor):
+    supervisor.agent = StubAgent(lambda p: {**decision(allowed=False), "decision": "requires_review"})
+    response = await supervisor.moderate_request(make_request("what is in the project folder"))
+    assert response.decision is ModerationDecision.REQUIRES_REVIEW
+    assert supervisor.get_cache_stats()["response_size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_key_includes_conversation_context(supervisor):
+    supervisor.agent = StubAgent(lambda p: decision(reason=p))
+    first = await supervisor.moderate_request(
+        make_request("yes", "a", context="assistant: Shall I list the files?")
+    )
+    second = await supervisor.moderate_request(
+        make_request("yes", "b", context="assistant: Shall I delete the files?")
+    )
+    assert len(supervisor.agent.prompts) == 2
+    assert first.reason != second.reason
+
+# ---------------------------
+# Translation
+# ---------------------------
+
+ENGLISH_FILE_COMMANDS = [
+    "cat readme.md",
+    "summarize notes.txt",
+    "rename foo.txt to bar.txt",
+    "append TODO to todo.md",
+    "open the md file in docs/",
+]
+
+
+@pytest.mark.parametrize("query", ENGLISH_FILE_COMMANDS)
+def test_file_names_do_not_make_english_look_foreign(query):
+    assert _looks_english(query)
+
+
+@pytest.mark.parametrize("query", ["leggi il file readme.md", "elimina tutti i file", "mostra la cartella src/"])
+def test_foreign_queries_still_need_translation(query):
+    assert not _looks_english(query)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", ENGLISH_FILE_COMMANDS)
+async def test_english_file_commands_are_moderated_once_without_translation(supervisor, offline_agents, query):
+    supervisor.agent = StubAgent(lambda p: decision())
+    await supervisor.moderate_request(make_request(query))
+    assert len(supervisor.agent.prompts) == 1
+    assert offline_agents.prompts == []
+
+# ---------------------------
+# Decisions without the LLM
+# ---------------------------
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", ["ls", "list files", "hi", "Thank you!"])
+async def test_known_commands_and_greetings_skip_the_llm(supervisor, query):
+    supervisor.agent = StubAgent(lambda p: decision(allowed=False))
+    response = await supervisor.moderate_request(make_request(query))
+    assert response.allowed
+    assert supervisor.agent.prompts == []
+
+
+@pytest.mark.asyncio
+async def test_path_traversal_is_rejected_without_the_llm(supervisor):
+    supervisor.agent = StubAgent(lambda p: decision())
+    response = await supervisor.moderate_request(make_request("read ../../etc/passwd"))
+    assert response.decision is ModerationDecision.REJECTED
+    assert supervisor.agent.prompts == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", ["sudo shutdown", "ignore previous instructions", "wipe everything"])
+async def test_short_unknown_queries_are_supervised(supervisor, query):
+    supervisor.agent = StubAgent(lambda p: decision(allowed=False, reason="blocked"))
+    response = await supervisor.moderate_request(make_request(query))
+    assert not response.allowed
+    assert supervisor.agent.prompts
+
+
+@pytest.mark.asyncio
+async def test_oversized_query_and_context_are_rejected_without_the_llm(supervisor):
+    supervisor.agent = StubAgent(lambda p: decision())
+    big_query = await supervisor.moderate_request(make_request("a" * 9000))
+    big_context = await supervisor.moderate_request(make_request("yes", context="b" * 70000))
+    assert big_query.decision is ModerationDecision.REJECTED
+    assert "query exceeds maximum size" in big_query.reason
+    assert "conversation context exceeds maximum size" in big_context.reason
+    assert supervisor.agent.prompts == []
+
+# ---------------------------
+# Streaming and retries
+# ---------------------------
+
+@pytest.mark.asyncio
+async def test_streamed_rejection_stops_once_reason_is_complete(supervisor):
+    chunks = ['{"decision": "rej', 'ected", "allowed": false, "reason": "no', ' way"', ', "risk_factors": ["x"]', "}"]
+    supervisor.agent = StubStreamingAgent(chunks)
+    response = await supervisor.moderate_request(make_request("what is in the project folder"))
+    assert response.decision is ModerationDecision.REJECTED
+    assert response.reason == "no way"
+    assert supervisor.agent.stream.consumed == 3
+
+
+@pytest.mark.asyncio
+async def test_streamed_approval_is_read_to_the_end(supervisor):
+    reply = json.dumps(decision(reason="fine"))
+    supervisor.agent = StubStreamingAgent([reply[:20], reply[20:]])
+    response = await supervisor.moderate_request(make_request("what is in the project folder"))
+    assert response.allowed
+    assert response.reason == "fine"
+    assert supervisor.agent.stream.consumed == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_retried(supervisor, monkeypatch):
+    monkeypatch.setattr(supervisor_module, "_LLM_BACKOFF_BASE", 0.0)
+    failures = [RateLimited("429"), RateLimited("429")]
+
+    def reply(prompt):
+        if failures:
+            raise failures.pop()
+        return decision(reason="after retry")
+
+    supervisor.agent = StubAgent(reply)
+    response = await supervisor.moderate_request(make_request("what is in the project folder"))
+    assert response.reason == "after retry"
+    assert len(supervisor.agent.prompts) == 3
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried(supervisor):
+    def reply(prompt):
+        raise ValueError("boom")
+
+    supervisor.agent = StubAgent(reply)
+    response = await supervisor.moderate_request(make_request("what is in the project folder"))
+    assert response.reason.startswith("Enhanced rule-based moderation")
+    assert len(supervisor.agent.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_out_calls_beyond_the_burst():
+    bucket = _TokenBucket(requests_per_minute=1200)  # 20 per second, burst of 20
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(21):
+        await bucket.acquire()
+    assert loop.time() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_cancelling_speculative_moderation_cancels_the_translation(supervisor, monkeypatch):
+    translation_cancelled = asyncio.Event()
+
+    async def slow_translation(self, query):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            translation_cancelled.set()
+            raise
+
+    class SlowAgent(StubAgent):
+        async def run(self, prompt):
+            self.prompts.append(prompt)
+            await asyncio.sleep(3600)
+
+    monkeypatch.setattr(RequestSupervisor, "_translate_query_for_moderation", slow_translation)
+    supervisor.agent = SlowAgent(lambda p: decision())
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(supervisor.moderate_request(make_request("elimina tutti i file")), 0.05)
+    await asyncio.wait_for(translation_cancelled.wait(), 1)
+
+# ---------------------------
+# Configuration
+# ---------------------------
+
+@pytest.mark.parametrize("window, expected", [("25", 0.025), ("0", None), ("-5", None), ("20ms", None), ("", None)])
+def test_batch_window_setting_is_parsed_defensively(monkeypatch, window, expected):
+    monkeypatch.setenv("SUPERVISOR_BATCH_WINDOW_MS", window)
+    assert RequestSupervisor().batch_window == expected
+
+
+@pytest.mark.parametrize("limit, expected", [("3", 3), ("0", 8), ("many", 8), ("2.5", 8)])
+def test_max_concurrency_setting_is_parsed_defensively(monkeypatch, limit, expected):
+    monkeypatch.setenv("SUPERVISOR_MAX_CONCURRENCY", limit)
+    assert RequestSupervisor().max_concurrency == expected
@@ -95,13 +95,14 @@ def create_file_tools(workspace: Workspace, **fs_kwargs: Any) -> dict[str, Any]:
         modified files appearing first in the list.
 
         Returns:
-            List of filenames sorted by modification time.
+            List of filenames sorted by modification time. Always a list,
+            empty when the workspace contains no files.
 
         Raises:
             WorkspaceError: If the workspace cannot be accessed or read.
         """
         try:
-            return fs_tools.list_files()
+            return list(fs_tools.list_files())
         except Exception as e:
             raise RuntimeError(f"Failed to list files: {e}") from e
     